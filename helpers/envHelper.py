@@ -24,6 +24,24 @@ class Settings(BaseSettings):
     # API Keys
     gemini_api_key: Optional[str] = Field(default=None, description="Google Gemini API key")
 
+    # Gemini Request Limits
+    gemini_concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum concurrent Gemini extraction requests"
+    )
+
+    # Gemini Extraction Cache
+    gemini_cache_dir: str = Field(
+        default="data/gemini_cache",
+        description="Directory for cached Gemini extraction results"
+    )
+    gemini_cache_max_bytes: int = Field(
+        default=50_000_000,
+        ge=0,
+        description="Extraction cache size cap in bytes (0 disables the cache)"
+    )
+
 
 # Create a global settings instance
 settings = Settings()
@@ -2,10 +2,22 @@
 Gemini Helper - Integration with Google Gemini API for data extraction
 """
 
-from typing import List, Dict, Any, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate
+from typing import List, Dict, Any, Literal, Optional, Tuple, Union
+import httpx
 from google import genai
 from google.genai import types
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from helpers.envHelper import settings
 from helpers.loggerHelper import get_logger
 
@@ -14,6 +26,85 @@ logger = get_logger(__name__)
 
 GEMINI_MODEL = "gemini-2.5-flash"
 
+# Bump whenever the extraction prompt changes so cached results are invalidated
+PROMPT_VERSION = "v2"
+
+# Page framing used when combining crawled pages for extraction
+PAGE_HEADER_TEMPLATE = "--- PAGE: {} ---\n"
+PAGE_SEPARATOR = b"\n\n"
+TRUNCATION_MARKER = b"\n...[content truncated]"
+BLOCK_SEPARATOR = b"\n\n"  # Splits page content into blocks for boilerplate removal
+
+# Retry-with-feedback when Gemini output fails schema validation
+MAX_VALIDATION_RETRIES = 2
+VALIDATION_RETRY_BACKOFF_SECONDS = 1.0
+
+# Explicit context cache for the invariant extraction prompt
+PROMPT_CACHE_TTL_SECONDS = 3600
+PROMPT_CACHE_REFRESH_MARGIN_SECONDS = 300
+PROMPT_CACHE_RETRY_SECONDS = 600
+PROMPT_CACHE_MIN_TOKENS = 1024  # Explicit caching minimum for gemini-2.5-flash
+
+# Keep connections to the Gemini API open between requests
+GEMINI_KEEPALIVE_CONNECTIONS = 32
+GEMINI_KEEPALIVE_EXPIRY_SECONDS = 90.0
+GEMINI_TIMEOUT_MS = 300_000  # Per request; large extractions can take minutes
+
+# Batch API polling
+BATCH_POLL_INTERVAL_SECONDS = 30
+BATCH_TERMINAL_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+
+# Standard service names - encoded as an enum in the response schema so
+# Gemini can map services without the full list in the prompt
+StandardService = Literal[
+    "Wellness & Preventive Exams",
+    "Puppy & Kitten Care Programs",
+    "Vaccinations & Titers",
+    "Flea, Tick & Heartworm Prevention",
+    "Microchipping",
+    "Senior Pet Wellness",
+    "Nutrition & Diet Counseling",
+    "Sick Pet Examinations",
+    "Pain Management",
+    "Internal Medicine Consults",
+    "Anal Gland Expression",
+    "In-House Laboratory",
+    "Radiology (X-rays)",
+    "Ultrasound",
+    "Allergy Testing",
+    "Cytology (Ear, Skin)",
+    "Urinalysis/Fecal Exam",
+    "Cardiac & Respiratory Diagnostics",
+    "Spay/Neuter Surgery",
+    "Soft Tissue Surgery",
+    "Orthopedic Surgery",
+    "Dental Cleaning & Extractions",
+    "Dermatology",
+    "Ophthalmology",
+    "Oncology",
+    "Behavioral Counseling",
+    "Urgent Care Appointments",
+    "Emergency Stabilization",
+    "IV Fluid Therapy",
+    "Post-Surgical Recovery Monitoring",
+    "Isolation & Infectious Disease Care",
+    "Quality of Life/Euthanasia Consult",
+    "Hospice & Palliative Care",
+    "Humane Euthanasia Services",
+    "Laser Therapy",
+    "Acupuncture",
+    "Physical Therapy / Rehabilitation",
+    "Homeopathy",
+    "Medication Refill Pick-up",
+    "Prescription Diet Pick-up",
+]
+
 
 # Pydantic models for response schema - Frontend compatible
 class Professional(BaseModel):
@@ -53,14 +144,172 @@ class BusinessData(BaseModel):
     professionals: List[Professional] = []
     manager: str = ""
     operationsLead: str = ""
-    servicesOffered: List[str] = []
+    servicesOffered: List[Union[StandardService, str]] = []
     servicesNotOffered: str = ""
     specialties: List[str] = []
 
 
+# Compile the validator and JSON schema once at import and reuse them per call
+_BUSINESS_ADAPTER = TypeAdapter(BusinessData)
+_BUSINESS_JSON_SCHEMA = _BUSINESS_ADAPTER.json_schema()
+
+# Shared generation config - identical for every extraction call
+_GEMINI_CONFIG = types.GenerateContentConfig(
+    temperature=0,
+    response_mime_type="application/json",
+    # Plain JSON schema keeps output constrained server-side without
+    # the SDK building its own parsed object from the response
+    response_json_schema=_BUSINESS_JSON_SCHEMA,
+    thinking_config=types.ThinkingConfig(thinking_budget=0),  # Disable thinking
+)
+
+# Same settings in the JSON form used by Batch API request files
+_BATCH_GENERATION_CONFIG = _GEMINI_CONFIG.model_dump(mode="json", exclude_none=True)
+
+
+class ExtractionCache:
+    """
+    Content-addressable disk cache for validated extraction results.
+
+    Entries are keyed by a SHA-256 of the model, prompt version and page
+    content, so identical scrapes skip the Gemini call entirely. The
+    directory is capped at max_bytes; least recently used entries are
+    evicted first. On Cloud Run the filesystem is in memory, so the cap
+    bounds the instance's memory use as well.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def new_key_hasher() -> "hashlib._Hash":
+        """
+        Start a cache key hash seeded with the model and prompt version.
+
+        The model and prompt version are length-prefixed so field boundaries
+        can't collide. The prepared page content is fed in last by
+        _prepare_content_for_extraction, and hexdigest() gives the key.
+
+        Returns:
+            SHA-256 hash object
+        """
+        hasher = hashlib.sha256()
+        for field in (GEMINI_MODEL.encode("utf-8"), PROMPT_VERSION.encode("utf-8")):
+            hasher.update(len(field).to_bytes(8, "big"))
+            hasher.update(field)
+        return hasher
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[BusinessData]:
+        """
+        Look up a cached extraction result.
+
+        Args:
+            key: Cache key from new_key_hasher
+
+        Returns:
+            Cached BusinessData, or None on a miss or unreadable entry
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = json.load(f)
+            data = _BUSINESS_ADAPTER.validate_python(blob["data"])
+            # Refresh mtime so eviction drops the least recently used entries
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", key, e)
+            return None
+
+    def set(self, key: str, data: BusinessData) -> None:
+        """
+        Atomically write an extraction result to the cache.
+
+        Empty results are not cached, so a failed extraction is retried on
+        the next request.
+
+        Args:
+            key: Cache key from new_key_hasher
+            data: Validated extraction result
+        """
+        if not self.enabled or data == BusinessData():
+            return
+        try:
+            blob = {
+                "model": GEMINI_MODEL,
+                "prompt_version": PROMPT_VERSION,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "data": data.model_dump(mode="json"),
+            }
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(blob, f)
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            self._evict()
+        except Exception as e:
+            logger.warning("Failed to write cache entry %s: %s", key, e)
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total_bytes += stat.st_size
+
+        if total_bytes <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            if total_bytes <= self.max_bytes:
+                break
+
+
+extraction_cache = ExtractionCache(
+    settings.gemini_cache_dir, settings.gemini_cache_max_bytes
+)
+
+
+_GEMINI_LIMITS = httpx.Limits(
+    max_keepalive_connections=GEMINI_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY_SECONDS,
+)
+
+# Async pool owned by the cached client, so warm instances reuse open
+# connections across requests. Created with the client, closed on shutdown.
+_HTTPX: Optional[httpx.AsyncClient] = None
+
+
+@lru_cache(maxsize=1)
 def get_gemini_client() -> genai.Client:
     """
-    Get initialized Gemini client
+    Get the shared Gemini client, creating it on first use
 
     Returns:
         Configured Gemini client
@@ -68,23 +317,190 @@ def get_gemini_client() -> genai.Client:
     Raises:
         ValueError: If GEMINI_API_KEY is not set
     """
+    global _HTTPX
+
     api_key = settings.gemini_api_key
     if not api_key:
         raise ValueError(
             "Gemini API key is required. Set GEMINI_API_KEY environment variable."
         )
-    return genai.Client(api_key=api_key)
+    _HTTPX = httpx.AsyncClient(limits=_GEMINI_LIMITS, http2=True)
+    # An explicit httpx client keeps the SDK on pooled HTTP/2 connections.
+    # The SDK passes its own per-request timeout, so it's set here rather
+    # than on the httpx client.
+    return genai.Client(
+        api_key=api_key,
+        http_options=types.HttpOptions(
+            timeout=GEMINI_TIMEOUT_MS, httpx_async_client=_HTTPX
+        ),
+    )
+
+
+async def close_gemini_http_client() -> None:
+    """Close the shared Gemini client's connection pool and drop the cached client"""
+    global _HTTPX
+
+    get_gemini_client.cache_clear()
+    if _HTTPX is not None:
+        await _HTTPX.aclose()
+        _HTTPX = None
+
+
+# Bounds in-flight Gemini requests to stay within the project's quota
+_GEMINI_SEM = asyncio.Semaphore(settings.gemini_concurrency)
+
+_prompt_cache: Optional[types.CachedContent] = None
+_prompt_cache_supported: Optional[bool] = None
+_prompt_cache_retry_at: Optional[datetime] = None
+_prompt_cache_lock = asyncio.Lock()
+
+
+async def _prompt_meets_cache_minimum(client: genai.Client) -> bool:
+    """
+    Check once whether the extraction prompt is large enough to cache.
+
+    Explicit context caching rejects content under PROMPT_CACHE_MIN_TOKENS,
+    so below that size the prompt is always sent inline.
+
+    Args:
+        client: Gemini client
+
+    Returns:
+        True if the prompt can be cached
+    """
+    global _prompt_cache_supported
+
+    if _prompt_cache_supported is None:
+        count = await client.aio.models.count_tokens(
+            model=GEMINI_MODEL, contents=_EXTRACTION_PROMPT
+        )
+        prompt_tokens = count.total_tokens or 0
+        _prompt_cache_supported = prompt_tokens >= PROMPT_CACHE_MIN_TOKENS
+        if not _prompt_cache_supported:
+            logger.info(
+                "Extraction prompt is %s tokens, below the %s token context "
+                "caching minimum; sending it inline",
+                prompt_tokens,
+                PROMPT_CACHE_MIN_TOKENS,
+            )
+    return _prompt_cache_supported
+
+
+async def _get_prompt_cache_name(client: genai.Client) -> Optional[str]:
+    """
+    Get the context cache holding the extraction prompt.
+
+    The cache is created on first use if the prompt meets the caching
+    minimum, and its TTL is extended shortly before it expires. If a call
+    fails, callers send the prompt inline and it is retried after
+    PROMPT_CACHE_RETRY_SECONDS.
+
+    Args:
+        client: Gemini client
+
+    Returns:
+        Cached content name, or None if the prompt isn't cached
+    """
+    global _prompt_cache, _prompt_cache_retry_at
+
+    async with _prompt_cache_lock:
+        if _prompt_cache_supported is False:
+            return None
+
+        now = datetime.now(timezone.utc)
+        if (
+            _prompt_cache is not None
+            and _prompt_cache.expire_time is not None
+            and _prompt_cache.expire_time - now
+            > timedelta(seconds=PROMPT_CACHE_REFRESH_MARGIN_SECONDS)
+        ):
+            return _prompt_cache.name
+
+        if _prompt_cache_retry_at is not None and now < _prompt_cache_retry_at:
+            return None
+
+        ttl = f"{PROMPT_CACHE_TTL_SECONDS}s"
+        previous_cache = _prompt_cache
+        try:
+            # Extend the existing cache rather than creating a new one
+            if previous_cache is not None:
+                try:
+                    _prompt_cache = await client.aio.caches.update(
+                        name=previous_cache.name,
+                        config=types.UpdateCachedContentConfig(ttl=ttl),
+                    )
+                    _prompt_cache_retry_at = None
+                    return _prompt_cache.name
+                except Exception as e:
+                    logger.warning("Failed to extend prompt context cache: %s", e)
+
+            if not await _prompt_meets_cache_minimum(client):
+                _prompt_cache = None
+                return None
+
+            _prompt_cache = await client.aio.caches.create(
+                model=GEMINI_MODEL,
+                config=types.CreateCachedContentConfig(
+                    contents=[_EXTRACTION_PROMPT],
+                    ttl=ttl,
+                ),
+            )
+            _prompt_cache_retry_at = None
+            logger.info("Created prompt context cache %s", _prompt_cache.name)
+        except Exception as e:
+            logger.warning("Prompt context cache unavailable, sending inline: %s", e)
+            _prompt_cache = None
+            _prompt_cache_retry_at = now + timedelta(seconds=PROMPT_CACHE_RETRY_SECONDS)
+
+        # Don't leave a replaced cache accruing storage until it expires
+        if previous_cache is not None:
+            try:
+                await client.aio.caches.delete(name=previous_cache.name)
+            except Exception as e:
+                logger.warning(
+                    "Failed to delete prompt context cache %s: %s",
+                    previous_cache.name,
+                    e,
+                )
+
+        return _prompt_cache.name if _prompt_cache is not None else None
+
+
+async def warm_gemini_client(client: Optional[genai.Client] = None) -> None:
+    """
+    Open a pooled connection to the Gemini API and create the prompt
+    context cache ahead of the first request.
+
+    Failures are logged and ignored; the connection is simply opened later.
+
+    Args:
+        client: Optional pre-initialized Gemini client
+    """
+    try:
+        if client is None:
+            client = get_gemini_client()
+        await client.aio.models.list(config={"page_size": 1})
+        await _get_prompt_cache_name(client)
+        logger.info("Gemini connection warmed up")
+    except Exception as e:
+        logger.warning("Gemini warm-up failed: %s", e)
 
 
 async def extract_business_data(
-    pages_data: List[Dict[str, str]], client: Optional[genai.Client] = None
+    pages_data: List[Dict[str, str]],
+    client: Optional[genai.Client] = None,
+    no_cache: bool = False,
 ) -> BusinessData:
     """
     Extract structured business data from crawled pages using Gemini.
 
+    Results are cached on disk by content hash; identical page content is
+    served from the cache without calling Gemini.
+
     Args:
         pages_data: List of dicts with 'url' and 'content' keys
         client: Optional pre-initialized Gemini client
+        no_cache: Skip the cache lookup and force a fresh extraction
 
     Returns:
         BusinessData model with extracted business information
@@ -92,86 +508,415 @@ async def extract_business_data(
     if client is None:
         client = get_gemini_client()
 
-    # Prepare content for Gemini
-    combined_content = _prepare_content_for_extraction(pages_data)
+    # Prepare content for Gemini, hashing it for the cache key in the same pass
+    key_hasher = ExtractionCache.new_key_hasher()
+    combined_content = _prepare_content_for_extraction(pages_data, key_hasher)
+    cache_key = key_hasher.hexdigest()
 
-    # Create extraction prompt
-    prompt = _build_extraction_prompt()
+    if not no_cache:
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Extraction cache hit for %s", cache_key)
+            return cached
 
     try:
-        # Call Gemini API with response schema (asynchronously)
-        response = await client.aio.models.generate_content(
-            model=GEMINI_MODEL,
-            contents=f"{prompt}\n\n{combined_content}",
-            config=types.GenerateContentConfig(
-                temperature=0,
-                response_mime_type="application/json",
-                response_schema=BusinessData,  # Use Pydantic model for response schema
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=0
-                ),  # Disable thinking
-            ),
-        )
-
-        # Use parsed response - Gemini automatically validates against schema
-        extracted_data: BusinessData = response.parsed
-        return extracted_data
+        # Reference the cached prompt when available, otherwise send it inline.
+        # Prompt and content go as separate parts, avoiding a combined copy.
+        cache_name = await _get_prompt_cache_name(client)
+        if cache_name is not None:
+            config = _GEMINI_CONFIG.model_copy(update={"cached_content": cache_name})
+            message = [types.Part(text=combined_content)]
+        else:
+            config = _GEMINI_CONFIG
+            message = [
+                types.Part(text=_EXTRACTION_PROMPT),
+                types.Part(text=combined_content),
+            ]
+
+        # Use a chat session so validation errors can be fed back as a
+        # follow-up turn without rebuilding the original request
+        chat = client.aio.chats.create(model=GEMINI_MODEL, config=config)
+        async with _GEMINI_SEM:
+            response = await chat.send_message(message)
+
+        for attempt in range(MAX_VALIDATION_RETRIES + 1):
+            # A reply with no content (blocked, safety stop, empty candidate) is a
+            # failed call. The SDK drops such turns from chat history, so a
+            # feedback turn would reach the model without the pages.
+            if response.text is None:
+                logger.error(
+                    "Gemini returned no content (finish reason: %s)",
+                    _finish_reason(response),
+                )
+                return BusinessData()
+
+            try:
+                # Parse and validate the raw JSON in a single pass
+                extracted_data = _BUSINESS_ADAPTER.validate_json(response.text)
+                extraction_cache.set(cache_key, extracted_data)
+                return extracted_data
+            except ValidationError as e:
+                # Output cut off at the token limit would just be truncated
+                # again, at the cost of resending the full history
+                if _finish_reason(response) == types.FinishReason.MAX_TOKENS:
+                    logger.error(
+                        "Gemini output hit the token limit and failed validation, "
+                        "not retrying: %s",
+                        e,
+                    )
+                    return BusinessData()
+                if attempt == MAX_VALIDATION_RETRIES:
+                    logger.error(
+                        "Gemini output failed validation after %s retries: "
+                        "%s\nRaw response: %s",
+                        attempt,
+                        e,
+                        response.text,
+                    )
+                    return BusinessData()
+                logger.warning(
+                    "Gemini output failed validation (attempt %s), retrying",
+                    attempt + 1,
+                )
+                await asyncio.sleep(VALIDATION_RETRY_BACKOFF_SECONDS * (attempt + 1))
+                async with _GEMINI_SEM:
+                    response = await chat.send_message(
+                        f"Your output had error: {e}. Fix and retry."
+                    )
 
     except Exception as e:
-        logger.error(f"Error calling Gemini API: {e}", exc_info=True)
+        # Lazy formatting; the traceback is only captured when DEBUG is on
+        if logger.isEnabledFor(logging.ERROR):
+            logger.error(
+                "Error calling Gemini API: %s",
+                e,
+                exc_info=logger.isEnabledFor(logging.DEBUG),
+            )
         # Return empty BusinessData model on error
         return BusinessData()
 
 
-def _prepare_content_for_extraction(pages_data: List[Dict[str, str]]) -> str:
+def _finish_reason(
+    response: types.GenerateContentResponse,
+) -> Optional[types.FinishReason]:
+    """
+    Get the finish reason of a response's first candidate.
+
+    Args:
+        response: Gemini response
+
+    Returns:
+        Finish reason, or None if the response has no candidates
+    """
+    if not response.candidates:
+        return None
+    return response.candidates[0].finish_reason
+
+
+async def extract_business_data_many(
+    sites: List[List[Dict[str, str]]], client: Optional[genai.Client] = None
+) -> List[Union[BusinessData, BaseException]]:
+    """
+    Extract structured business data for several sites concurrently.
+
+    Calls run in parallel, bounded by the gemini_concurrency setting, and
+    share the client's connection pool.
+
+    Args:
+        sites: List of crawled sites, each a list of dicts with 'url' and 'content' keys
+        client: Optional pre-initialized Gemini client
+
+    Returns:
+        Results in the same order as sites; a failed site's entry is the
+        exception it raised
+    """
+    if client is None:
+        client = get_gemini_client()
+
+    return await asyncio.gather(
+        *(extract_business_data(pages_data, client) for pages_data in sites),
+        return_exceptions=True,
+    )
+
+
+async def extract_business_data_batch(
+    sites: List[List[Dict[str, str]]], client: Optional[genai.Client] = None
+) -> List[BusinessData]:
+    """
+    Extract structured business data for many sites using the Gemini Batch API.
+
+    Batch jobs are cheaper and have higher rate limits than synchronous calls,
+    but can take a long time to complete. Use extract_business_data for
+    low-latency, single-site requests.
+
+    Args:
+        sites: List of crawled sites, each a list of dicts with 'url' and 'content' keys
+        client: Optional pre-initialized Gemini client
+
+    Returns:
+        List of BusinessData models in the same order as sites. Sites that
+        failed to extract are returned as empty BusinessData models.
+
+    Raises:
+        RuntimeError: If the batch job does not succeed
+    """
+    if not sites:
+        return []
+
+    if client is None:
+        client = get_gemini_client()
+
+    # Build the JSONL request file, keyed by the site's index
+    with tempfile.NamedTemporaryFile(
+        mode="w", suffix=".jsonl", encoding="utf-8", delete=False
+    ) as request_file:
+        for site_id, pages_data in enumerate(sites):
+            combined_content = _prepare_content_for_extraction(pages_data)
+            line = {
+                "key": str(site_id),
+                "request": {
+                    "contents": [
+                        {
+                            "role": "user",
+                            "parts": [
+                                {"text": _EXTRACTION_PROMPT},
+                                {"text": combined_content},
+                            ],
+                        }
+                    ],
+                    "generation_config": _BATCH_GENERATION_CONFIG,
+                },
+            }
+            request_file.write(json.dumps(line) + "\n")
+        request_path = request_file.name
+
+    try:
+        uploaded = await client.aio.files.upload(
+            file=request_path,
+            config=types.UploadFileConfig(mime_type="jsonl"),
+        )
+    finally:
+        os.remove(request_path)
+
+    job = await client.aio.batches.create(
+        model=GEMINI_MODEL, src=uploaded.name
+    )
+    logger.info("Created Gemini batch job %s for %s sites", job.name, len(sites))
+
+    while job.state.name not in BATCH_TERMINAL_STATES:
+        await asyncio.sleep(BATCH_POLL_INTERVAL_SECONDS)
+        job = await client.aio.batches.get(name=job.name)
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        raise RuntimeError(
+            f"Gemini batch job {job.name} finished with state {job.state.name}"
+        )
+
+    result_bytes = await client.aio.files.download(file=job.dest.file_name)
+
+    results = [BusinessData() for _ in sites]
+    for raw_line in result_bytes.decode("utf-8").splitlines():
+        if not raw_line.strip():
+            continue
+        result = json.loads(raw_line)
+        site_id = int(result["key"])
+        try:
+            text = result["response"]["candidates"][0]["content"]["parts"][0]["text"]
+            results[site_id] = _BUSINESS_ADAPTER.validate_json(text)
+        except Exception as e:
+            logger.error(
+                "Batch extraction failed for site %s: %s",
+                site_id,
+                result.get("error", e),
+            )
+
+    return results
+
+
+def _prepare_content_for_extraction(
+    pages_data: List[Dict[str, str]], hasher: Optional["hashlib._Hash"] = None
+) -> str:
     """
     Prepare crawled page content for extraction.
 
     Args:
         pages_data: List of dicts with 'url' and 'content' keys
+        hasher: Optional hash object updated with the encoded output as it is built
 
     Returns:
         Combined formatted content string
     """
-    # Limit content to avoid token limits (roughly 800k characters for Gemini 2.0)
-    max_chars_per_page = 50000
-    max_total_chars = 500000
+    # Limit content to avoid token limits. Budgets are in UTF-8 bytes, which
+    # track token counts more closely than characters for non-ASCII text.
+    max_bytes_per_page = 50000
+    max_total_bytes = 500000
+
+    # Skip empty pages (isspace checks without copying the page)
+    pages = [
+        (page.get("url", "Unknown URL"), page.get("content", ""))
+        for page in pages_data
+    ]
+
+    # Truncate before deduplicating, so the one kept copy of a repeated block
+    # is never on content that truncation later cuts off
+    encoded_pages = [
+        (
+            url,
+            encoded
+            if len(encoded) <= max_bytes_per_page
+            else _truncate_utf8(encoded, max_bytes_per_page) + TRUNCATION_MARKER,
+        )
+        for url, encoded in (
+            (url, content.encode("utf-8"))
+            for url, content in pages
+            if content and not content.isspace()
+        )
+    ]
+
+    # Drop duplicate pages and repeated header/footer/nav blocks. Kept copies
+    # sit on the earliest page containing them, so the prefix kept by the
+    # budget check below always includes them.
+    # Size accounting is only done when the debug log would be emitted
+    log_savings = logger.isEnabledFor(logging.DEBUG)
+    if log_savings:
+        original_size = sum(len(body) for _, body in encoded_pages)
+    encoded_pages = _drop_repeated_blocks(_drop_duplicate_pages(encoded_pages))
+    if log_savings:
+        deduped_size = sum(len(body) for _, body in encoded_pages)
+        logger.debug(
+            "Deduplication removed %s of %s content bytes",
+            original_size - deduped_size,
+            original_size,
+        )
 
-    formatted_pages = []
-    total_chars = 0
+    headers = [
+        PAGE_HEADER_TEMPLATE.format(url).encode("utf-8") for url, _ in encoded_pages
+    ]
+    bodies = [body for _, body in encoded_pages]
 
-    for page in pages_data:
-        url = page.get("url", "Unknown URL")
-        content = page.get("content", "")
+    # Keep the longest prefix of pages that fits in the total budget
+    running_totals = list(
+        accumulate(
+            len(header) + len(body) + len(PAGE_SEPARATOR)
+            for header, body in zip(headers, bodies)
+        )
+    )
+    page_count = bisect_right(running_totals, max_total_bytes)
 
-        # Skip empty pages
-        if not content.strip():
-            continue
+    # Collect encoded chunks and join once, instead of building a string per page
+    parts: List[bytes] = []
+    for header, body in zip(headers[:page_count], bodies[:page_count]):
+        parts.extend((header, body, PAGE_SEPARATOR))
+        if hasher is not None:
+            # One bulk update per chunk; hashlib releases the GIL for large inputs
+            hasher.update(header)
+            hasher.update(body)
+            hasher.update(PAGE_SEPARATOR)
 
-        # Truncate very long pages
-        if len(content) > max_chars_per_page:
-            content = content[:max_chars_per_page] + "\n...[content truncated]"
+    return b"".join(parts).decode("utf-8")
 
-        page_text = f"--- PAGE: {url} ---\n{content}\n\n"
 
-        # Check if adding this page would exceed total limit
-        if total_chars + len(page_text) > max_total_chars:
-            break
+def _content_hash(data: bytes) -> bytes:
+    """
+    Hash content for deduplication.
 
-        formatted_pages.append(page_text)
-        total_chars += len(page_text)
+    blake2b is used over sha256 since this is not a security hash and
+    blake2b is faster in pure-CPU throughput.
+    """
+    return hashlib.blake2b(data, digest_size=16).digest()
 
-    return "".join(formatted_pages)
 
+def _drop_duplicate_pages(pages: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """
+    Drop pages whose content exactly matches an earlier page.
 
-def _build_extraction_prompt() -> str:
+    Args:
+        pages: List of (url, encoded content) tuples
+
+    Returns:
+        Pages with exact duplicates removed, in original order
     """
-    Build the extraction prompt for Gemini.
+    seen = set()
+    unique_pages = []
+    for url, body in pages:
+        digest = _content_hash(body)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        unique_pages.append((url, body))
+    return unique_pages
+
+
+def _drop_repeated_blocks(pages: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """
+    Strip boilerplate blocks repeated across most pages.
+
+    Pages are split into blocks on blank lines. Blocks appearing on more than
+    half of the pages (headers, footers, navigation) are kept only where they
+    first occur, so details like a footer phone number still reach Gemini once.
+
+    Args:
+        pages: List of (url, encoded content) tuples
+
+    Returns:
+        Pages with repeated blocks removed; pages left empty are dropped
+    """
+    page_blocks = [body.split(BLOCK_SEPARATOR) for _, body in pages]
+    page_hashes = [
+        [_content_hash(block.strip()) if block.strip() else None for block in blocks]
+        for blocks in page_blocks
+    ]
+
+    # Count each block once per page it appears on
+    block_counts = Counter(
+        digest for hashes in page_hashes for digest in set(hashes) if digest is not None
+    )
+    boilerplate = {
+        digest
+        for digest, count in block_counts.items()
+        if count > 1 and count > len(pages) / 2
+    }
+    if not boilerplate:
+        return pages
+
+    emitted = set()
+    stripped_pages = []
+    for (url, _), blocks, hashes in zip(pages, page_blocks, page_hashes):
+        kept_blocks = []
+        for block, digest in zip(blocks, hashes):
+            if digest in boilerplate:
+                if digest in emitted:
+                    continue
+                emitted.add(digest)
+            kept_blocks.append(block)
+        body = BLOCK_SEPARATOR.join(kept_blocks)
+        if body.strip():
+            stripped_pages.append((url, body))
+    return stripped_pages
+
+
+def _truncate_utf8(data: bytes, max_bytes: int) -> bytes:
+    """
+    Truncate UTF-8 bytes without splitting a multi-byte character.
+
+    Args:
+        data: UTF-8 encoded bytes
+        max_bytes: Maximum length of the result
 
     Returns:
-        Structured prompt string
+        Prefix of data no longer than max_bytes that decodes cleanly
     """
-    return """You are a data extraction specialist. Extract structured information about a business from the provided website content.
+    if len(data) <= max_bytes:
+        return data
+    end = max_bytes
+    # Back off while the first dropped byte is a continuation byte (0b10xxxxxx)
+    while end > 0 and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    return data[:end]
+
+
+# Extraction prompt for Gemini - sent as its own part ahead of the page content
+_EXTRACTION_PROMPT = """You are a data extraction specialist. Extract structured information about a business from the provided website content.
 
 Extract all available information about the business. The data will be validated against a strict schema and sent directly to a frontend form.
 
@@ -239,52 +984,9 @@ INSTRUCTIONS:
     - If none found, return empty string ""
 
 15. servicesOffered: Extract ALL services offered as an array of strings
-      - IMPORTANT: Map extracted services to the following STANDARD LIST if possible.
+    - IMPORTANT: Map each service to a standard name from the servicesOffered enum in the response schema if possible.
     - If a service on the website matches a standard service (even if named slightly differently), use the STANDARD NAME.
     - If it does not match any, use the name found on the website.
-    - STANDARD SERVICE LIST:
-      [
-        "Wellness & Preventive Exams",
-        "Puppy & Kitten Care Programs",
-        "Vaccinations & Titers",
-        "Flea, Tick & Heartworm Prevention",
-        "Microchipping",
-        "Senior Pet Wellness",
-        "Nutrition & Diet Counseling",
-        "Sick Pet Examinations",
-        "Pain Management",
-        "Internal Medicine Consults",
-        "Anal Gland Expression",
-        "In-House Laboratory",
-        "Radiology (X-rays)",
-        "Ultrasound",
-        "Allergy Testing",
-        "Cytology (Ear, Skin)",
-        "Urinalysis/Fecal Exam",
-        "Cardiac & Respiratory Diagnostics",
-        "Spay/Neuter Surgery",
-        "Soft Tissue Surgery",
-        "Orthopedic Surgery",
-        "Dental Cleaning & Extractions",
-        "Dermatology",
-        "Ophthalmology",
-        "Oncology",
-        "Behavioral Counseling",
-        "Urgent Care Appointments",
-        "Emergency Stabilization",
-        "IV Fluid Therapy",
-        "Post-Surgical Recovery Monitoring",
-        "Isolation & Infectious Disease Care",
-        "Quality of Life/Euthanasia Consult",
-        "Hospice & Palliative Care",
-        "Humane Euthanasia Services",
-        "Laser Therapy",
-        "Acupuncture",
-        "Physical Therapy / Rehabilitation",
-        "Homeopathy",
-        "Medication Refill Pick-up",
-        "Prescription Diet Pick-up"
-      ]
     - Format: ["Standard Name 1", "Standard Name 2", "Other Found Name"]
     - If none found, return empty array []
 
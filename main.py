@@ -7,6 +7,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes.scraper import router as scraper_router
 from helpers.envHelper import settings
+from helpers.geminiHelper import (
+    close_gemini_http_client,
+    get_gemini_client,
+    warm_gemini_client,
+)
 from helpers.loggerHelper import setup_logger
 from crawl4ai import AsyncWebCrawler, BrowserConfig
 
@@ -32,6 +37,17 @@ async def lifespan(app: FastAPI):
     app.state.crawler = crawler
     logger.info("AsyncWebCrawler initialized successfully")
 
+    # Create the shared Gemini client up front so the first request doesn't pay for it
+    gemini_warmup = None
+    try:
+        gemini_client = get_gemini_client()
+        logger.info("Gemini client initialized successfully")
+        # Open the TLS connection in the background without delaying startup
+        gemini_warmup = asyncio.create_task(warm_gemini_client(gemini_client))
+        app.state.gemini_warmup = gemini_warmup
+    except ValueError as e:
+        logger.warning(f"Gemini client not initialized: {e}")
+
     try:
         yield
     finally:
@@ -40,6 +56,17 @@ async def lifespan(app: FastAPI):
         await crawler.__aexit__(None, None, None)
         logger.info("AsyncWebCrawler shut down successfully")
 
+        # Shutdown: Stop the warm-up before closing the pool it may still be using
+        if gemini_warmup is not None and not gemini_warmup.done():
+            gemini_warmup.cancel()
+            try:
+                await gemini_warmup
+            except asyncio.CancelledError:
+                pass
+
+        # Shutdown: Close pooled Gemini connections
+        await close_gemini_http_client()
+
 
 app = FastAPI(title="Simple API", version="1.0.0", lifespan=lifespan)
 
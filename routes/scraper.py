@@ -18,6 +18,17 @@ logger = get_logger(__name__)
 
 router = APIRouter(prefix="/scraper", tags=["scraper"])
 
+# Compiled once at import rather than on every request validation
+URL_PATTERN = re.compile(
+    r"^https?://"  # http:// or https://
+    r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain
+    r"localhost|"  # localhost
+    r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # or IP
+    r"(?::\d+)?"  # optional port
+    r"(?:/?|[/?]\S+)$",
+    re.IGNORECASE,
+)
+
 
 class ScrapeRequest(BaseModel):
     """Request model for scraping a website"""
@@ -40,16 +51,7 @@ class ScrapeRequest(BaseModel):
     @validator("url")
     def validate_url(cls, v):
         """Validate URL format"""
-        url_pattern = re.compile(
-            r"^https?://"  # http:// or https://
-            r"(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|"  # domain
-            r"localhost|"  # localhost
-            r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})"  # or IP
-            r"(?::\d+)?"  # optional port
-            r"(?:/?|[/?]\S+)$",
-            re.IGNORECASE,
-        )
-        if not url_pattern.match(v):
+        if not URL_PATTERN.match(v):
             raise ValueError("Invalid URL format. Must start with http:// or https://")
         return v
 